@@ -24,16 +24,33 @@ print("Django setup complete.", flush=True)
 from django.core.management import call_command
 from django.db import connection
 
+# Tables confirmed to exist; a table won't disappear during the script's
+# lifetime, so positive results are safe to cache. Negative results are NOT
+# cached so a freshly migrated table is re-detected on the next check.
+_existing_tables = set()
+
+
+# pg_class probe instead of information_schema.tables: the info_schema view
+# joins several catalog tables, while this hits pg_class_relname_nsp_index
+# directly.
+_TABLE_EXISTS_SQL = """
+    SELECT 1 FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relname = %s AND n.nspname = 'public' AND c.relkind = 'r'
+    LIMIT 1;
+"""
+
+
 def check_table_exists(table_name):
-    """Check if a table exists in the database."""
+    """Check if a table exists in the database (positive results memoized)."""
+    if table_name in _existing_tables:
+        return True
     with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            );
-        """, [table_name])
-        return cursor.fetchone()[0]
+        cursor.execute(_TABLE_EXISTS_SQL, [table_name])
+        exists = cursor.fetchone() is not None
+    if exists:
+        _existing_tables.add(table_name)
+    return exists
 
 def clear_migration_records(app_label):
     """Clear migration records for an app to allow re-running migrations."""
@@ -75,9 +92,8 @@ def main():
         print("Table already exists, running normal migrations...", flush=True)
         call_command('migrate', '--run-syncdb', verbosity=2)
 
-    # Collect static files
-    print("Collecting static files...", flush=True)
-    call_command('collectstatic', '--noinput')
+    # Collect static files (skipped when sources are unchanged)
+    collect_static()
 
     # Seed initial stock data if database is empty
     seed_initial_stocks()
@@ -90,6 +106,92 @@ def main():
     print("=" * 50, flush=True)
 
 
+def collect_static():
+    """Run collectstatic only when the static sources actually changed.
+
+    collectstatic walks the whole static tree and recomputes WhiteNoise's
+    manifest hashes every deploy. Fingerprint the sources (deploy git SHA
+    plus per-file mtimes) and compare against a sentinel written next to the
+    collected files; on a match the entire step is skipped.
+    """
+    import hashlib
+    from django.conf import settings
+    from django.contrib.staticfiles.finders import get_finders
+
+    fingerprint = hashlib.sha1()
+    git_sha = os.getenv('RAILWAY_GIT_COMMIT_SHA') or os.getenv('GIT_SHA', '')
+    fingerprint.update(git_sha.encode())
+    for finder in get_finders():
+        for path, storage in finder.list(ignore_patterns=[]):
+            try:
+                mtime = storage.get_modified_time(path).isoformat()
+            except (NotImplementedError, OSError):
+                mtime = ''
+            fingerprint.update(f'{path}:{mtime}'.encode())
+    digest = fingerprint.hexdigest()
+
+    sentinel = os.path.join(settings.STATIC_ROOT, '.collected_sha')
+    try:
+        with open(sentinel) as f:
+            if f.read().strip() == digest:
+                print("Static files unchanged, skipping collectstatic.", flush=True)
+                return
+    except OSError:
+        pass
+
+    print("Collecting static files...", flush=True)
+    call_command('collectstatic', '--noinput')
+    os.makedirs(settings.STATIC_ROOT, exist_ok=True)
+    with open(sentinel, 'w') as f:
+        f.write(digest)
+
+
+# Secondary price indexes that can be deferred during an empty-DB seed.
+# Every bulk INSERT otherwise maintains them row by row; dropping first and
+# recreating after cuts the write amplification. Unique constraints and
+# primary keys are never touched. Keyed by the connection alias they live on.
+_SEED_INDEXES = {
+    'adjusted': [
+        ('stocks_stoc_stock_i_50f999_idx', 'stocks_stockprice', '(stock_id, date DESC)'),
+    ],
+    'daily': [
+        ('stocks_dail_stock_i_13914e_idx', 'stocks_dailystockprice', '(stock_id, date DESC)'),
+    ],
+    'intraday': [
+        ('stocks_intr_stock_i_d435b1_idx', 'stocks_intradaystockprice', '(stock_id, timestamp DESC)'),
+        ('stocks_intr_timesta_fa5756_idx', 'stocks_intradaystockprice', '(timestamp)'),
+    ],
+}
+
+
+def _drop_seed_indexes():
+    from django.db import connections
+    from stocks.db import ADJUSTED_DB, DAILY_DB, INTRADAY_DB
+
+    alias_map = {'adjusted': ADJUSTED_DB, 'daily': DAILY_DB, 'intraday': INTRADAY_DB}
+    for logical, indexes in _SEED_INDEXES.items():
+        with connections[alias_map[logical]].cursor() as cursor:
+            for name, _table, _columns in indexes:
+                cursor.execute(f'DROP INDEX IF EXISTS {name};')
+    print("Dropped secondary price indexes for seeding.", flush=True)
+
+
+def _recreate_seed_indexes():
+    from django.db import connections
+    from stocks.db import ADJUSTED_DB, DAILY_DB, INTRADAY_DB
+
+    alias_map = {'adjusted': ADJUSTED_DB, 'daily': DAILY_DB, 'intraday': INTRADAY_DB}
+    for logical, indexes in _SEED_INDEXES.items():
+        conn = connections[alias_map[logical]]
+        for name, table, columns in indexes:
+            # CONCURRENTLY cannot run inside a transaction block
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {columns};'
+                )
+    print("Recreated secondary price indexes.", flush=True)
+
+
 def seed_initial_stocks():
     """Fetch all S&P 500 stock data (weekly, daily, intraday) if the database is empty."""
     from stocks.models import Stock
@@ -108,8 +210,24 @@ def seed_initial_stocks():
         print("Using FAST concurrent fetcher (70 QPM, 4 QPS, 5 workers)", flush=True)
         print("Estimated time: ~20-25 minutes for all data types", flush=True)
 
+        # Empty-DB path only: optionally defer secondary price indexes so
+        # the bulk INSERTs don't maintain them row by row. Opt-in via
+        # ALLOW_INDEX_DROP to avoid accidental index drops elsewhere.
+        defer_indexes = os.getenv('ALLOW_INDEX_DROP', 'False') == 'True'
+        if defer_indexes:
+            try:
+                _drop_seed_indexes()
+            except Exception as e:
+                print(f"Warning: could not drop indexes, seeding with them in place: {e}", flush=True)
+                defer_indexes = False
+
         try:
-            # Use the fast concurrent fetcher for all data types
+            # Use the fast concurrent fetcher for all data types. No
+            # transaction here: the command pre-creates the stock rows on
+            # this thread (already atomic per model inside seed_stock_rows)
+            # and its worker threads write price rows on their own
+            # connections, so the parent rows must be committed before the
+            # pool starts or every price upsert hits an FK violation.
             call_command(
                 'fetch_stocks_fast',
                 all=True,
@@ -128,6 +246,12 @@ def seed_initial_stocks():
             print(f"Warning: Error seeding stocks: {e}", flush=True)
             import traceback
             traceback.print_exc()
+        finally:
+            if defer_indexes:
+                try:
+                    _recreate_seed_indexes()
+                except Exception as e:
+                    print(f"Warning: could not recreate indexes: {e}", flush=True)
     else:
         print(f"Database already has {stock_count} stocks, skipping seed.", flush=True)
 
@@ -59,6 +59,10 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Per-IP budget for social_login's outbound OAuth verify calls
+        'social_login': os.getenv('SOCIAL_LOGIN_THROTTLE_RATE', '10/min'),
+    },
 }
 
 # Simple JWT configuration
@@ -123,52 +127,52 @@ WSGI_APPLICATION = 'stock_backend.wsgi.application'
 # Database configuration - use DATABASE_URL if available (Railway), otherwise use local config
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Keep connections open between requests so each request skips the
+# psycopg2 connect (TCP + auth) handshake. Health checks (Django 4.1+)
+# detect stale pooled connections before they are handed out.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+
 if DATABASE_URL:
-    # Production: Use single database from Railway
+    # Production: Use single database from Railway.
+    # For high connection counts, front Postgres with pgbouncer in
+    # transaction pooling mode and set DISABLE_SERVER_SIDE_CURSORS=True
+    # (server-side cursors don't survive transaction-pooled connections).
+    # Single alias only: duplicating the config under 'adjusted'/'daily'/
+    # 'intraday' would give each alias its own persistent connection to the
+    # same server (4x the connection count per worker). Code resolves the
+    # logical aliases through stocks.db, which falls back to 'default' here.
     DATABASES = {
-        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600),
+        'default': dj_database_url.config(
+            default=DATABASE_URL,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True,
+        ),
     }
-    # Point all database aliases to the same database in production
-    DATABASES['adjusted'] = DATABASES['default']
-    DATABASES['daily'] = DATABASES['default']
-    DATABASES['intraday'] = DATABASES['default']
 else:
     # Local development: Use multiple PostgreSQL databases
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('RAW_DB_NAME', 'stocks_raw'),
-            'USER': os.getenv('RAW_DB_USER', 'stocks_user'),
-            'PASSWORD': os.getenv('RAW_DB_PASSWORD', 'your_password_here'),
-            'HOST': os.getenv('RAW_DB_HOST', 'localhost'),
-            'PORT': os.getenv('RAW_DB_PORT', '5432'),
-        },
-        'adjusted': {
+    def _pg(env_prefix, default_name):
+        """Build a PostgreSQL connection dict from <PREFIX>_DB_* env vars."""
+        return {
             'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('ADJUSTED_DB_NAME', 'stocks_adjusted'),
-            'USER': os.getenv('ADJUSTED_DB_USER', 'stocks_user'),
-            'PASSWORD': os.getenv('ADJUSTED_DB_PASSWORD', 'your_password_here'),
-            'HOST': os.getenv('ADJUSTED_DB_HOST', 'localhost'),
-            'PORT': os.getenv('ADJUSTED_DB_PORT', '5432'),
-        },
-        'daily': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('DAILY_DB_NAME', 'stocks_daily'),
-            'USER': os.getenv('DAILY_DB_USER', 'stocks_user'),
-            'PASSWORD': os.getenv('DAILY_DB_PASSWORD', 'your_password_here'),
-            'HOST': os.getenv('DAILY_DB_HOST', 'localhost'),
-            'PORT': os.getenv('DAILY_DB_PORT', '5432'),
-        },
-        'intraday': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('INTRADAY_DB_NAME', 'stocks_intraday'),
-            'USER': os.getenv('INTRADAY_DB_USER', 'stocks_user'),
-            'PASSWORD': os.getenv('INTRADAY_DB_PASSWORD', 'your_password_here'),
-            'HOST': os.getenv('INTRADAY_DB_HOST', 'localhost'),
-            'PORT': os.getenv('INTRADAY_DB_PORT', '5432'),
+            'NAME': os.getenv(f'{env_prefix}_DB_NAME', default_name),
+            'USER': os.getenv(f'{env_prefix}_DB_USER', 'stocks_user'),
+            'PASSWORD': os.getenv(f'{env_prefix}_DB_PASSWORD', 'your_password_here'),
+            'HOST': os.getenv(f'{env_prefix}_DB_HOST', 'localhost'),
+            'PORT': os.getenv(f'{env_prefix}_DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'sslmode': os.getenv('DB_SSLMODE', 'prefer')},
         }
+
+    DATABASES = {
+        'default': _pg('RAW', 'stocks_raw'),
+        'adjusted': _pg('ADJUSTED', 'stocks_adjusted'),
+        'daily': _pg('DAILY', 'stocks_daily'),
+        'intraday': _pg('INTRADAY', 'stocks_intraday'),
     }
 
+DISABLE_SERVER_SIDE_CURSORS = os.getenv('DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+
 # Database router to separate raw and adjusted data (only used locally with multiple DBs)
 if not DATABASE_URL:
     DATABASE_ROUTERS = ['stocks.db_router.StockRouter']
@@ -207,9 +211,26 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 # Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Redis gives all gunicorn workers one shared cache (locmem is per-process,
+# so entries are duplicated and cross-worker invalidation is impossible).
+# Fall back to locmem when REDIS_URL is unset (local dev without Redis).
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'socket_timeout': 2,
+                'socket_connect_timeout': 2,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
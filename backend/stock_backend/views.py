@@ -1,11 +1,17 @@
 """
 Custom authentication views for social login.
 """
+import hashlib
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.core.cache import cache
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from allauth.socialaccount.models import SocialAccount
@@ -13,6 +19,26 @@ from allauth.socialaccount.models import SocialAccount
 User = get_user_model()
 
 
+class SocialLoginThrottle(SimpleRateThrottle):
+    """
+    Per-IP throttle for social_login.
+
+    Every POST triggers an outbound HTTPS verify call to Google/Microsoft,
+    so an unthrottled attacker can exhaust provider quota and tie up
+    workers. Buckets are keyed by client IP + provider and stored in the
+    default cache (shared across workers when Redis is configured); excess
+    requests get 429 with Retry-After.
+    """
+    scope = 'social_login'
+
+    def get_cache_key(self, request, view):
+        provider = request.data.get('provider', '')
+        return self.cache_format % {
+            'scope': f'{self.scope}:{provider}',
+            'ident': self.get_ident(request),
+        }
+
+
 def get_tokens_for_user(user):
     """Generate JWT tokens for a user."""
     refresh = RefreshToken.for_user(user)
@@ -22,16 +48,43 @@ def get_tokens_for_user(user):
     }
 
 
+# Shared session so OAuth verifications reuse pooled TLS connections to
+# Google/Microsoft instead of paying a fresh TCP+TLS handshake per call.
+# Transient 5xx responses are retried with a short backoff.
+_oauth_session = requests.Session()
+_oauth_session.mount('https://', HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+))
+
+# How long a positive userinfo verification is cached. Short enough that a
+# revoked token stops working quickly, long enough to absorb SPA retries.
+TOKEN_VERIFY_CACHE_TTL = 300
+
+
+def _token_cache_key(prefix, access_token):
+    """Cache key for a verified token. Hashed so raw credentials never hit
+    cache storage."""
+    return prefix + hashlib.sha256(access_token.encode()).hexdigest()
+
+
 def verify_google_token(access_token):
-    """Verify Google OAuth token and get user info."""
+    """Verify Google OAuth token and get user info (positive results cached)."""
+    key = _token_cache_key('oauth:g:', access_token)
+    user_info = cache.get(key)
+    if user_info is not None:
+        return user_info
     try:
-        response = requests.get(
+        response = _oauth_session.get(
             'https://www.googleapis.com/oauth2/v3/userinfo',
             headers={'Authorization': f'Bearer {access_token}'},
-            timeout=10
+            timeout=(2, 8)
         )
         if response.status_code == 200:
-            return response.json()
+            user_info = response.json()
+            cache.set(key, user_info, timeout=TOKEN_VERIFY_CACHE_TTL)
+            return user_info
         return None
     except Exception as e:
         print(f"Google token verification error: {e}")
@@ -39,23 +92,29 @@ def verify_google_token(access_token):
 
 
 def verify_microsoft_token(access_token):
-    """Verify Microsoft OAuth token and get user info."""
+    """Verify Microsoft OAuth token and get user info (positive results cached)."""
+    key = _token_cache_key('oauth:m:', access_token)
+    user_info = cache.get(key)
+    if user_info is not None:
+        return user_info
     try:
-        response = requests.get(
+        response = _oauth_session.get(
             'https://graph.microsoft.com/v1.0/me',
             headers={'Authorization': f'Bearer {access_token}'},
-            timeout=10
+            timeout=(2, 8)
         )
         if response.status_code == 200:
             data = response.json()
             # Normalize to match Google's format
-            return {
+            user_info = {
                 'sub': data.get('id'),
                 'email': data.get('mail') or data.get('userPrincipalName'),
                 'name': data.get('displayName'),
                 'given_name': data.get('givenName'),
                 'family_name': data.get('surname'),
             }
+            cache.set(key, user_info, timeout=TOKEN_VERIFY_CACHE_TTL)
+            return user_info
         return None
     except Exception as e:
         print(f"Microsoft token verification error: {e}")
@@ -64,6 +123,7 @@ def verify_microsoft_token(access_token):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([SocialLoginThrottle])
 def social_login(request):
     """
     Exchange OAuth access token for Django JWT tokens.
@@ -119,26 +179,30 @@ def social_login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Get or create user
+    # Get or create user. create_user(password=None) marks the password
+    # unusable before the INSERT, so the new-user path is a single save
+    # instead of save + set_unusable_password + save.
     try:
         user = User.objects.get(email=email)
     except User.DoesNotExist:
-        # Create new user
         user = User.objects.create_user(
             username=email,
             email=email,
+            password=None,  # Social login users don't need password
             first_name=user_info.get('given_name', ''),
             last_name=user_info.get('family_name', ''),
         )
-        user.set_unusable_password()  # Social login users don't need password
-        user.save()
 
-    # Create or update social account link
+    # Create or update social account link. A single INSERT ... ON CONFLICT
+    # DO UPDATE replaces update_or_create's SELECT + UPDATE/INSERT pair.
+    # Keyed on allauth's native (provider, uid) unique constraint so no
+    # third-party schema change is needed.
     uid = user_info.get('sub') or user_info.get('id')
-    SocialAccount.objects.update_or_create(
-        user=user,
-        provider=provider,
-        defaults={'uid': uid, 'extra_data': user_info}
+    SocialAccount.objects.bulk_create(
+        [SocialAccount(user=user, provider=provider, uid=uid, extra_data=user_info)],
+        update_conflicts=True,
+        update_fields=['user', 'extra_data'],
+        unique_fields=['provider', 'uid'],
     )
 
     # Generate JWT tokens
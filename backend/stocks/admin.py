@@ -13,6 +13,7 @@ class StockAdmin(admin.ModelAdmin):
 @admin.register(StockPrice)
 class StockPriceAdmin(admin.ModelAdmin):
     list_display = ['stock', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+    list_select_related = ('stock',)
     list_filter = ['stock', 'date']
     search_fields = ['stock__symbol']
     date_hierarchy = 'date'
@@ -22,6 +23,7 @@ class StockPriceAdmin(admin.ModelAdmin):
 @admin.register(StockSplit)
 class StockSplitAdmin(admin.ModelAdmin):
     list_display = ['stock', 'split_date', 'split_ratio', 'description', 'created_at']
+    list_select_related = ('stock',)
     list_filter = ['split_date', 'stock']
     search_fields = ['stock__symbol', 'description']
     date_hierarchy = 'split_date'
@@ -31,6 +33,7 @@ class StockSplitAdmin(admin.ModelAdmin):
 @admin.register(AdjustedStockPrice)
 class AdjustedStockPriceAdmin(admin.ModelAdmin):
     list_display = ['stock', 'date', 'adjusted_close', 'adjusted_volume', 'split_coefficient']
+    list_select_related = ('stock',)
     list_filter = ['stock', 'date']
     search_fields = ['stock__symbol']
     date_hierarchy = 'date'
@@ -0,0 +1,21 @@
+"""
+Database alias resolution for stock data.
+
+Locally the stock data lives in separate 'adjusted'/'daily'/'intraday'
+databases. In production (DATABASE_URL) everything is one Railway database,
+and defining the extra aliases there would make Django open a separate
+pooled connection per alias to the same server. Code should route through
+these constants instead of hardcoding alias strings, so production uses the
+single 'default' connection.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _resolve(alias):
+    return alias if alias in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+ADJUSTED_DB = _resolve('adjusted')
+DAILY_DB = _resolve('daily')
+INTRADAY_DB = _resolve('intraday')
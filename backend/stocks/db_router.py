@@ -13,46 +13,70 @@ class StockRouter:
     # Models that belong to the intraday database
     intraday_models = {'intradaystock', 'intradaystockprice'}
 
-    def db_for_read(self, model, **hints):
-        """Direct read operations to the appropriate database."""
+    # Memoized model -> db alias decisions. The router runs on every ORM
+    # query, and model classes are per-process singletons whose routing never
+    # changes, so a dict hit replaces the _meta lookups and set membership
+    # tests. Reads and writes route identically, so one cache serves both.
+    _model_db_cache = {}
+
+    # Memoized (db, app_label, model_name) -> bool migration decisions
+    _migrate_cache = {}
+
+    def _db_for_model(self, model):
+        """Compute (and cache) which database a model belongs to."""
+        try:
+            return self._model_db_cache[model]
+        except KeyError:
+            pass
         if model._meta.app_label == 'stocks':
             # Check if this is a daily model
             if model._meta.model_name in self.daily_models:
-                return 'daily'
+                db = 'daily'
             # Check if this is an intraday model
-            if model._meta.model_name in self.intraday_models:
-                return 'intraday'
-            return 'adjusted'
-        return 'default'
+            elif model._meta.model_name in self.intraday_models:
+                db = 'intraday'
+            else:
+                db = 'adjusted'
+        else:
+            db = 'default'
+        self._model_db_cache[model] = db
+        return db
+
+    def db_for_read(self, model, **hints):
+        """Direct read operations to the appropriate database."""
+        return self._db_for_model(model)
 
     def db_for_write(self, model, **hints):
         """Direct write operations to the appropriate database."""
-        if model._meta.app_label == 'stocks':
-            # Check if this is a daily model
-            if model._meta.model_name in self.daily_models:
-                return 'daily'
-            # Check if this is an intraday model
-            if model._meta.model_name in self.intraday_models:
-                return 'intraday'
-            return 'adjusted'
-        return 'default'
+        return self._db_for_model(model)
+
+    # Databases whose objects may relate to each other
+    _allowed_dbs = frozenset({'default', 'adjusted', 'daily', 'intraday'})
 
     def allow_relation(self, obj1, obj2, **hints):
         """Allow relations if both models are in the same database."""
-        db_set = {'default', 'adjusted', 'daily', 'intraday'}
-        if obj1._state.db in db_set and obj2._state.db in db_set:
+        if obj1._state.db in self._allowed_dbs and obj2._state.db in self._allowed_dbs:
             return True
         return None
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         """Ensure migrations run on the correct database."""
+        key = (db, app_label, model_name)
+        try:
+            return self._migrate_cache[key]
+        except KeyError:
+            pass
         if app_label == 'stocks':
             # Daily models go to daily database
             if model_name in self.daily_models:
-                return db == 'daily'
+                allowed = db == 'daily'
             # Intraday models go to intraday database
-            if model_name in self.intraday_models:
-                return db == 'intraday'
+            elif model_name in self.intraday_models:
+                allowed = db == 'intraday'
             # Other stock models go to adjusted database
-            return db == 'adjusted'
-        return db == 'default'
+            else:
+                allowed = db == 'adjusted'
+        else:
+            allowed = db == 'default'
+        self._migrate_cache[key] = allowed
+        return allowed
@@ -1,5 +1,20 @@
-from django.core.management.base import BaseCommand
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _run_fetch(command_name, delay):
+    """Run one fetch command in a worker process.
+
+    Module-level so it pickles for ProcessPoolExecutor. Forked workers
+    inherit the parent's DB connections, so close them first and let the
+    child open fresh ones.
+    """
+    connections.close_all()
+    call_command(command_name, all=True, force=True, delay=delay)
+    return command_name
 
 
 class Command(BaseCommand):
@@ -37,28 +52,49 @@ class Command(BaseCommand):
         # If no specific option, fetch all
         fetch_all = not (weekly_only or daily_only or intraday_only)
 
-        self.stdout.write(self.style.WARNING(f'Using {delay}s delay between API calls'))
-        self.stdout.write('')
-
+        commands = []
         if fetch_all or weekly_only:
-            self.stdout.write(self.style.WARNING('=' * 50))
-            self.stdout.write(self.style.WARNING('FETCHING WEEKLY DATA FOR ALL S&P 500 STOCKS'))
-            self.stdout.write(self.style.WARNING('=' * 50))
-            call_command('fetch_weekly_stocks', all=True, force=True, delay=delay)
-
+            commands.append('fetch_weekly_stocks')
         if fetch_all or daily_only:
-            self.stdout.write('')
-            self.stdout.write(self.style.WARNING('=' * 50))
-            self.stdout.write(self.style.WARNING('FETCHING DAILY DATA FOR ALL S&P 500 STOCKS'))
-            self.stdout.write(self.style.WARNING('=' * 50))
-            call_command('fetch_daily_stocks', all=True, force=True, delay=delay)
-
+            commands.append('fetch_daily_stocks')
         if fetch_all or intraday_only:
-            self.stdout.write('')
-            self.stdout.write(self.style.WARNING('=' * 50))
-            self.stdout.write(self.style.WARNING('FETCHING INTRADAY DATA FOR ALL S&P 500 STOCKS'))
-            self.stdout.write(self.style.WARNING('=' * 50))
-            call_command('fetch_intraday_stocks', all=True, force=True, delay=delay)
+            commands.append('fetch_intraday_stocks')
+
+        self.stdout.write(self.style.WARNING(f'Using {delay}s delay between API calls'))
+        self.stdout.write('')
+
+        if len(commands) == 1:
+            # Single data type: no point forking a worker pool
+            self.stdout.write(self.style.WARNING(f'Running {commands[0]}...'))
+            call_command(commands[0], all=True, force=True, delay=delay)
+        else:
+            # Run the three commands in parallel worker processes: at the
+            # same aggregate API pace (each child's delay is stretched
+            # below to respect the shared quota) the run finishes when the
+            # slowest data type does, instead of the sum of all three,
+            # because parsing and DB writes overlap across commands.
+            # Processes (not threads) keep each command's DB connections
+            # isolated.
+            self.stdout.write(self.style.WARNING(
+                f'Running {", ".join(commands)} in parallel...'
+            ))
+            # The commands share one API quota: --delay expresses the
+            # aggregate pace, so each concurrent child gets a proportionally
+            # longer delay to keep the combined call rate within it
+            child_delay = delay * len(commands)
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=len(commands)) as executor:
+                futures = {
+                    executor.submit(_run_fetch, name, child_delay): name
+                    for name in commands
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        future.result()
+                        self.stdout.write(self.style.SUCCESS(f'{name} finished'))
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'{name} failed: {e}'))
 
         self.stdout.write('')
         self.stdout.write(self.style.SUCCESS('=' * 50))
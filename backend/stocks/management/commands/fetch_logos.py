@@ -1,9 +1,19 @@
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
 from django.core.management.base import BaseCommand
 from stocks.models import Stock
 
+# Flush downloaded logos to the database in multi-row UPDATEs of this size
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Shared session so worker threads reuse kept-alive TLS connections to the
+# logo CDN instead of opening a fresh one per download. The pool is sized
+# for the highest worker count we run with.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=100))
+
 
 class Command(BaseCommand):
     help = 'Download stock logos from Parqet and store them in the database'
@@ -22,40 +32,62 @@ class Command(BaseCommand):
             help='Number of concurrent download threads (default: 10)'
         )
 
-    def download_logo(self, stock, force):
-        """Download a single logo. Returns (symbol, success, message)."""
-        if stock.logo and not force:
-            return (stock.symbol, True, 'skipped')
-
+    def download_logo(self, stock):
+        """Download a single logo onto the instance (not saved).
+        Returns (stock, success, message)."""
         url = f'https://assets.parqet.com/logos/symbol/{stock.symbol}'
         try:
-            response = requests.get(url, timeout=10)
+            # Conditional GET: when re-downloading an existing logo, let the
+            # CDN answer 304 with no body if it hasn't changed
+            headers = {}
+            if stock.logo_etag:
+                headers['If-None-Match'] = stock.logo_etag
+            if stock.logo_last_modified:
+                headers['If-Modified-Since'] = stock.logo_last_modified
+
+            response = _session.get(url, timeout=10, headers=headers)
+            if response.status_code == 304:
+                return (stock, True, 'not-modified')
             if response.status_code == 200:
                 content_type = response.headers.get('content-type', 'image/png')
                 stock.logo = response.content
                 stock.logo_content_type = content_type
-                stock.save(update_fields=['logo', 'logo_content_type'])
-                return (stock.symbol, True, f'downloaded ({len(response.content)} bytes)')
+                stock.logo_etag = response.headers.get('ETag')
+                stock.logo_last_modified = response.headers.get('Last-Modified')
+                return (stock, True, f'downloaded ({len(response.content)} bytes)')
             else:
-                return (stock.symbol, False, f'HTTP {response.status_code}')
+                return (stock, False, f'HTTP {response.status_code}')
         except Exception as e:
-            return (stock.symbol, False, str(e))
+            return (stock, False, str(e))
 
     def handle(self, *args, **options):
         symbols_arg = options['symbols']
         force = options['force']
         workers = options['workers']
 
+        skip_count = 0
         if symbols_arg:
             symbols = [s.strip().upper() for s in symbols_arg.split(',')]
-            stocks = list(Stock.objects.filter(symbol__in=symbols))
+            # with_logo() so the skip check below doesn't trigger a deferred
+            # load per row (the default manager defers the blob)
+            candidates = list(Stock.objects.with_logo().filter(symbol__in=symbols))
+            if force:
+                stocks = candidates
+            else:
+                stocks = [s for s in candidates if s.logo is None]
+                skip_count = len(candidates) - len(stocks)
+            total = len(stocks)
         else:
             if force:
-                stocks = list(Stock.objects.all())
+                queryset = Stock.objects.all()
             else:
-                stocks = list(Stock.objects.filter(logo__isnull=True))
-
-        total = len(stocks)
+                queryset = Stock.objects.filter(logo__isnull=True)
+            # Workers only need the symbol; project to id/symbol and stream
+            # the scan so memory stays flat no matter how many rows match
+            # (and the logo blob column is never hydrated).
+            queryset = queryset.only('id', 'symbol', 'logo_etag', 'logo_last_modified')
+            total = queryset.count()
+            stocks = queryset.iterator(chunk_size=500)
         if total == 0:
             self.stdout.write(self.style.SUCCESS('All stocks already have logos.'))
             return
@@ -64,25 +96,59 @@ class Command(BaseCommand):
 
         success_count = 0
         fail_count = 0
-        skip_count = 0
 
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = {
-                executor.submit(self.download_logo, stock, force): stock
-                for stock in stocks
-            }
-            for i, future in enumerate(as_completed(futures), 1):
-                symbol, success, message = future.result()
-                if message == 'skipped':
+        # Workers download only; the main thread flushes finished instances
+        # in one multi-row UPDATE per batch instead of one UPDATE per logo.
+        pending_updates = []
+
+        def flush_updates():
+            if pending_updates:
+                Stock.objects.bulk_update(
+                    pending_updates,
+                    ['logo', 'logo_content_type', 'logo_etag', 'logo_last_modified'],
+                    batch_size=BULK_UPDATE_BATCH_SIZE
+                )
+                pending_updates.clear()
+
+        done_count = 0
+
+        def handle_result(future):
+            nonlocal done_count, success_count, fail_count, skip_count
+            done_count += 1
+            stock, success, message = future.result()
+            if success:
+                if message == 'not-modified':
                     skip_count += 1
-                elif success:
-                    success_count += 1
                 else:
-                    fail_count += 1
-                    self.stdout.write(self.style.ERROR(f'[{i}/{total}] {symbol}: {message}'))
+                    success_count += 1
+                    pending_updates.append(stock)
+                    if len(pending_updates) >= BULK_UPDATE_BATCH_SIZE:
+                        flush_updates()
+            else:
+                fail_count += 1
+                self.stdout.write(self.style.ERROR(
+                    f'[{done_count}/{total}] {stock.symbol}: {message}'
+                ))
+
+            if done_count % 100 == 0:
+                self.stdout.write(f'  Progress: {done_count}/{total}...')
+
+        # Bounded submission: keep at most workers*2 downloads in flight so
+        # the streamed queryset is consumed lazily instead of turning the
+        # whole scan into a pile of queued futures up front.
+        max_in_flight = workers * 2
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for stock in stocks:
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle_result(future)
+                in_flight.add(executor.submit(self.download_logo, stock))
+            for future in as_completed(in_flight):
+                handle_result(future)
 
-                if i % 100 == 0:
-                    self.stdout.write(f'  Progress: {i}/{total}...')
+        flush_updates()
 
         self.stdout.write(self.style.SUCCESS(
             f'Done! Downloaded: {success_count}, Skipped: {skip_count}, Failed: {fail_count}'
@@ -2,56 +2,304 @@
 Fast concurrent stock data fetcher with rate limiting.
 Optimized for Alpha Vantage 75 QPM / 5 QPS plan.
 """
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db import transaction, close_old_connections
+from django.db import connections, transaction, close_old_connections
 from stocks.models import Stock, StockPrice, DailyStock, DailyStockPrice, IntradayStock, IntradayStockPrice, StockOverview, APICallLog
+from stocks.db import ADJUSTED_DB, DAILY_DB, INTRADAY_DB
+from psycopg2.extras import execute_values
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import csv
+import hashlib
+from email.utils import formatdate
+import json
 import os
-from datetime import datetime, timedelta
+from datetime import date as date_type, datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
 from .top5kcompanies import all_5k_stocks
+import random
+import re
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import deque
-import pytz
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Alpha Vantage returns timestamps in US Eastern time; resolving the
+# zone is a tz-database lookup, so do it once at import instead of per
+# intraday fetch
+_EASTERN = ZoneInfo('US/Eastern')
+
+
+# One pooled session shared by all worker threads: every fetch method used
+# to call requests.get directly, paying a TCP+TLS handshake per API call.
+# Kept-alive connections are reused across calls and the pool is sized for
+# the highest worker count we run with. Transient 5xx/connection failures
+# retry with backoff at the transport layer; Alpha Vantage's
+# application-level errors arrive as HTTP 200 and are handled per fetcher.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+    ),
+))
+
+
+def _ohlcv_upsert_sql(model, key_column):
+    """Multirow INSERT ... ON CONFLICT DO UPDATE for an OHLCV price table.
+
+    bulk_create(update_conflicts=True) still builds a full model instance
+    (plus _state bookkeeping) per row before rendering SQL; execute_values
+    sends plain tuples in pages and leaves conflict handling to Postgres,
+    which keeps peak RSS flat on 20-year daily payloads.
+    """
+    return f"""
+        INSERT INTO {model._meta.db_table}
+            (stock_id, {key_column}, open_price, high_price, low_price, close_price, volume)
+        VALUES %s
+        ON CONFLICT (stock_id, {key_column}) DO UPDATE SET
+            open_price = EXCLUDED.open_price,
+            high_price = EXCLUDED.high_price,
+            low_price = EXCLUDED.low_price,
+            close_price = EXCLUDED.close_price,
+            volume = EXCLUDED.volume
+    """
+
+
+_WEEKLY_UPSERT_SQL = _ohlcv_upsert_sql(StockPrice, 'date')
+_DAILY_UPSERT_SQL = _ohlcv_upsert_sql(DailyStockPrice, 'date')
+_INTRADAY_UPSERT_SQL = _ohlcv_upsert_sql(IntradayStockPrice, '"timestamp"')
+
+
+def _parse_adjusted_csv(text, stock_id):
+    """Parse an adjusted daily/weekly CSV body into upsert tuples.
+
+    The two endpoints share a layout (timestamp,open,high,low,close,
+    adjusted close,volume,...); the raw variant lacks the adjusted-close
+    column and is detected from the header width. The split/dividend
+    adjustment ratio derived from close vs adjusted close is applied to
+    open/high/low so the whole series is consistent.
+    """
+    # csv.reader is C-accelerated; fromisoformat is the C date fast path
+    reader = csv.reader(text.splitlines())
+    header = next(reader, [])
+    adjusted = len(header) > 6
+
+    # Per-row work is the hot loop of a full-history payload (~5000 rows
+    # per symbol), so name lookups are bound once and the adjustment
+    # multiplies are skipped for the rows after the latest split/dividend,
+    # where the ratio is exactly 1
+    fromisoformat = date_type.fromisoformat
+    rows = []
+    append = rows.append
+    for row in reader:
+        raw_close = float(row[4])
+        if adjusted:
+            adjusted_close = float(row[5])
+            volume = row[6]
+        else:
+            adjusted_close = raw_close
+            volume = row[5]
+
+        if adjusted_close == raw_close or raw_close == 0:
+            open_price = float(row[1])
+            high_price = float(row[2])
+            low_price = float(row[3])
+        else:
+            adj_ratio = adjusted_close / raw_close
+            open_price = float(row[1]) * adj_ratio
+            high_price = float(row[2]) * adj_ratio
+            low_price = float(row[3]) * adj_ratio
+
+        append((
+            stock_id,
+            fromisoformat(row[0]),
+            open_price,
+            high_price,
+            low_price,
+            adjusted_close,
+            int(volume),
+        ))
+    return rows
+
+# Alpha Vantage sends no ETag/Last-Modified validators, so unchanged
+# payloads are detected by body hash: on a match the JSON/CSV parse and the
+# whole upsert path are skipped. Hashes live in the shared cache for a week.
+AV_HASH_TTL = 7 * 86400
+
+# Rows per INSERT statement for bulk upserts (overridable for tuning, same
+# knob the daily/intraday commands use; --db-batch-size wins over the env)
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '1000'))
+
+
+def _parse_intraday_csv(text, stock_id):
+    """Parse an intraday CSV payload into upsert value tuples.
+
+    Price strings go through as-is: Postgres casts the literals to the
+    numeric columns, so the loop skips float round-trips.
+    """
+    reader = csv.reader(text.splitlines())
+    next(reader, None)  # header: timestamp,open,high,low,close,volume
+
+    # The Eastern UTC offset is constant within a trading day (DST flips
+    # at 02:00, before the 04:00 pre-market open), so resolve it once per
+    # date instead of a tz lookup per bar
+    offset_by_date = {}
+
+    rows = []
+    for timestamp_str, open_p, high_p, low_p, close_p, volume in reader:
+        naive_timestamp = datetime.fromisoformat(timestamp_str)
+        bar_date = naive_timestamp.date()
+        offset = offset_by_date.get(bar_date)
+        if offset is None:
+            offset = naive_timestamp.replace(tzinfo=_EASTERN).utcoffset()
+            offset_by_date[bar_date] = offset
+        utc_timestamp = (naive_timestamp - offset).replace(tzinfo=dt_timezone.utc)
+        rows.append((
+            stock_id,
+            utc_timestamp,
+            open_p,
+            high_p,
+            low_p,
+            close_p,
+            int(volume),
+        ))
+    return rows
+
+
+
+def _conditional_headers(last_updated):
+    """If-Modified-Since header for a revalidation GET.
+
+    Alpha Vantage currently answers 200 unconditionally, but the header is
+    free to send and lets any honoring cache or future CDN short-circuit
+    with a 304 before the body-hash check even runs.
+    """
+    if last_updated is None:
+        return {}
+    return {'If-Modified-Since': formatdate(last_updated.timestamp(), usegmt=True)}
 
 
 class RateLimiter:
     """
     Token bucket rate limiter for API calls.
-    Supports both QPM (queries per minute) and QPS (queries per second) limits.
+    Supports both QPM (queries per minute) and QPS (queries per second)
+    limits via two lazily refilled buckets. The lock is held only for the
+    refill arithmetic (microseconds), and a blocked caller sleeps exactly
+    until the emptier bucket has a token instead of polling on a timer.
     """
 
     def __init__(self, qpm=75, qps=5):
         self.qpm = qpm
         self.qps = qps
         self.lock = threading.Lock()
-        self.request_times = deque()  # For QPM tracking
-        self.second_requests = deque()  # For QPS tracking
-
-    def acquire(self):
-        """Wait until we can make a request within rate limits."""
-        while True:
-            with self.lock:
-                now = time.time()
+        # Waiters block on the condition instead of a bare sleep, so a
+        # release() can hand its credited token straight to the next
+        # waiter rather than leaving it to time out its full deficit
+        self.cond = threading.Condition(self.lock)
+        now = time.monotonic_ns()
+        # [tokens, last_refill_ns] pairs; tokens are fractional and refill
+        # at capacity/period per second, clamped to capacity
+        self._minute = [float(qpm), now]
+        self._second = [float(qps), now]
+        # Refill rates in tokens/second, computed once instead of per acquire
+        self._minute_rate = qpm / 60.0
+        self._second_rate = float(qps)
+
+    def acquire(self, cost=1):
+        """Wait until `cost` tokens are available, then take them.
+
+        Alpha Vantage bills every request as one call regardless of
+        endpoint or payload size, so callers use the default cost; the
+        parameter exists for APIs that weight expensive actions higher.
+        """
+        cost = float(cost)
+        with self.cond:
+            while True:
+                # monotonic_ns: integer reads from the monotonic clock, so
+                # refill accounting can't be skewed by NTP wall-clock jumps
+                now = time.monotonic_ns()
+
+                # Lazy refill; no per-request timestamps to scan or evict
+                for bucket, rate, cap in (
+                    (self._minute, self._minute_rate, float(self.qpm)),
+                    (self._second, self._second_rate, float(self.qps)),
+                ):
+                    bucket[0] = min(cap, bucket[0] + (now - bucket[1]) * 1e-9 * rate)
+                    bucket[1] = now
+
+                if self._minute[0] >= cost and self._second[0] >= cost:
+                    self._minute[0] -= cost
+                    self._second[0] -= cost
+                    return
 
-                # Clean old entries (older than 60 seconds for QPM)
-                while self.request_times and self.request_times[0] < now - 60:
-                    self.request_times.popleft()
+                # Wait for the exact deficit (the lock is dropped while
+                # waiting); a notify from release() ends the wait early
+                wait = max(
+                    (cost - self._minute[0]) / self._minute_rate,
+                    (cost - self._second[0]) / self._second_rate,
+                )
+                self.cond.wait(timeout=wait)
+
+    def release(self, cost=1):
+        """Credit tokens back when an acquired slot made no API call,
+        so the budget tracks actual network usage."""
+        cost = float(cost)
+        with self.cond:
+            self._minute[0] = min(float(self.qpm), self._minute[0] + cost)
+            self._second[0] = min(float(self.qps), self._second[0] + cost)
+            self.cond.notify()
+
+
+class SharedRateLimiter:
+    """
+    Cross-process rate limiter coordinated through the shared Django cache.
+    Atomic INCRs on per-window counters (one per minute, one per second)
+    let concurrent fetch_stocks_fast runs split a single API quota instead
+    of each spending it in full. A slot consumed from the minute window
+    while the second window is full is deliberately not refunded — it
+    slightly under-uses the quota, never overruns it.
+    """
 
-                # Clean old entries (older than 1 second for QPS)
-                while self.second_requests and self.second_requests[0] < now - 1:
-                    self.second_requests.popleft()
+    def __init__(self, qpm=75, qps=5, prefix='av:rl'):
+        self.qpm = qpm
+        self.qps = qps
+        self.prefix = prefix
 
-                # Check if we can make a request
-                if len(self.request_times) < self.qpm and len(self.second_requests) < self.qps:
-                    self.request_times.append(now)
-                    self.second_requests.append(now)
+    def acquire(self, cost=1):
+        """Wait until `cost` slots fit within the shared rate limits."""
+        while True:
+            now = time.time()
+            minute_key = f'{self.prefix}:m:{int(now // 60)}'
+            second_key = f'{self.prefix}:s:{int(now)}'
+            # add() is a no-op when the key exists, so the counter and its
+            # expiry are created exactly once per window
+            cache.add(minute_key, 0, 120)
+            cache.add(second_key, 0, 5)
+            if cache.incr(minute_key, cost) <= self.qpm:
+                if cache.incr(second_key, cost) <= self.qps:
                     return
-
-            # Wait a bit before checking again
-            time.sleep(0.1)
+                time.sleep(1 - (now % 1))
+            else:
+                time.sleep(min(60 - (now % 60), 5))
+
+    def release(self, cost=1):
+        """Best-effort refund into the current windows. A slot taken in a
+        window that has since rolled over is simply lost, matching this
+        class's under-use-never-overrun stance."""
+        now = time.time()
+        try:
+            cache.decr(f'{self.prefix}:m:{int(now // 60)}', cost)
+            cache.decr(f'{self.prefix}:s:{int(now)}', cost)
+        except ValueError:
+            pass
 
 
 class Command(BaseCommand):
@@ -136,23 +384,169 @@ class Command(BaseCommand):
             help='Seconds to wait between retry rounds (default: 60)',
             default=60
         )
+        parser.add_argument(
+            '--db-batch-size',
+            type=int,
+            help='Rows per INSERT statement for bulk upserts',
+            default=BULK_BATCH_SIZE
+        )
+
+    # (data_type, symbol) -> last_updated, primed in handle() with one bulk
+    # SELECT per data type; lets fresh symbols skip without touching the DB
+    _last_updated = {}
+
+    # data_type -> {symbol: stock instance}, preloaded in handle() so worker
+    # threads never issue a per-task get_or_create
+    _stock_rows = {}
+
+    # How recent is "recent enough" to skip a refetch, per data type
+    FRESHNESS = {
+        'weekly': timedelta(hours=1),
+        'daily': timedelta(hours=1),
+        'intraday': timedelta(minutes=30),
+    }
+
+    # Everything that differs between the three price endpoints, so a
+    # single fetch_prices body serves them all and every fast path (304
+    # revalidation, body-hash short-circuit, batched upsert) is applied in
+    # one place. datatype=csv throughout: a flat table is smaller on the
+    # wire than the dict-of-dicts JSON and parses without throwaway dicts.
+    PRICE_CONFIGS = {
+        'weekly': {
+            'url': 'https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY_ADJUSTED&symbol={symbol}&datatype=csv&apikey={api_key}',
+            'hash_key': 'av:sha:weekly:{symbol}',
+            'stock_model': Stock,
+            'db': ADJUSTED_DB,
+            'upsert_sql': _WEEKLY_UPSERT_SQL,
+            'parse': _parse_adjusted_csv,
+        },
+        'daily': {
+            'url': 'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&outputsize=full&datatype=csv&apikey={api_key}',
+            'hash_key': 'av:sha:daily:{symbol}',
+            'stock_model': DailyStock,
+            'db': DAILY_DB,
+            'upsert_sql': _DAILY_UPSERT_SQL,
+            'parse': _parse_adjusted_csv,
+        },
+        'intraday': {
+            'url': 'https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&datatype=csv&apikey={api_key}',
+            'hash_key': 'av:sha:intraday:{interval}:{symbol}',
+            'stock_model': IntradayStock,
+            'db': INTRADAY_DB,
+            'upsert_sql': _INTRADAY_UPSERT_SQL,
+            'parse': _parse_intraday_csv,
+        },
+    }
+
+    def needs_fetch(self, data_type, symbol, force):
+        """Zero-SQL freshness pre-check against the map primed in handle().
+        Runs before the rate limiter so fresh symbols consume no token."""
+        if force:
+            return True
+        window = self.FRESHNESS.get(data_type)
+        if window is None:
+            return True
+        cached = self._last_updated.get((data_type, symbol))
+        return not (cached and timezone.now() - cached < window)
+
+    # APICallLog rows are queued by workers and flushed in batched INSERTs
+    # by one background thread, keeping commit/fsync cost off the hot path
+    LOG_FLUSH_BATCH = 500
+    LOG_FLUSH_INTERVAL = 2.0
+
+    def _log_call(self, symbol, success, error_message=''):
+        """Queue an APICallLog row for the background flusher."""
+        self._log_queue.put(APICallLog(
+            symbol=symbol, success=success, error_message=error_message
+        ))
+
+    def _drain_logs(self):
+        """Flush queued log rows in batches until the None sentinel arrives."""
+        pending = []
+
+        def flush():
+            if pending:
+                try:
+                    APICallLog.objects.bulk_create(pending, batch_size=self.LOG_FLUSH_BATCH)
+                except Exception:
+                    pass  # call logging must never take down a fetch run
+                pending.clear()
+
+        while True:
+            try:
+                item = self._log_queue.get(timeout=self.LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                flush()
+                continue
+            if item is None:
+                flush()
+                break
+            pending.append(item)
+            if len(pending) >= self.LOG_FLUSH_BATCH:
+                flush()
+        close_old_connections()
 
     # Errors that should be retried (transient failures)
+    # Matched case-insensitively, which also folds the old
+    # 'rate limit'/'Rate limit' pair into one alternative
     RETRIABLE_ERRORS = [
         'rate limit',
-        'Rate limit',
-        'Information',
+        'information',
         'timed out',
         'timeout',
-        'ConnectionError',
-        'ConnectionPool',
+        'connectionerror',
+        'connectionpool',
     ]
+    _RETRIABLE_RE = re.compile('|'.join(map(re.escape, RETRIABLE_ERRORS)), re.IGNORECASE)
 
     def is_retriable_error(self, error):
         """Check if an error is transient and should be retried."""
-        if not error:
-            return False
-        return any(err in str(error) for err in self.RETRIABLE_ERRORS)
+        # One C-level scan of the compiled alternation instead of a
+        # Python loop of substring searches per failure
+        return bool(error) and self._RETRIABLE_RE.search(str(error)) is not None
+
+    def _flush_touched(self):
+        """Stamp last_updated for everything fetched since the last flush.
+
+        One bulk UPDATE per data type instead of a single-row UPDATE per
+        symbol. auto_now doesn't fire through update(), so the timestamp
+        is passed explicitly. Called from the main thread between runs,
+        when no worker is appending.
+        """
+        now = timezone.now()
+        for kind, queryset in (
+            ('weekly', Stock.objects),
+            ('daily', DailyStock.objects.using(DAILY_DB)),
+            ('intraday', IntradayStock.objects.using(INTRADAY_DB)),
+        ):
+            ids = self._touched.get(kind)
+            if ids:
+                queryset.filter(pk__in=ids).update(last_updated=now)
+                ids.clear()
+
+    def seed_stock_rows(self, symbols, weekly, daily, intraday):
+        """Bulk-create any missing stock rows before fetching starts.
+
+        A full seed would otherwise issue one get_or_create INSERT per symbol
+        per data type (500+ sequential round-trips); a single
+        bulk_create(ignore_conflicts=True) per model collapses that to a few
+        batched INSERTs, and existing rows are untouched.
+        """
+        targets = []
+        if weekly:
+            targets.append((Stock, ADJUSTED_DB))
+        if daily:
+            targets.append((DailyStock, DAILY_DB))
+        if intraday:
+            targets.append((IntradayStock, INTRADAY_DB))
+
+        for model, db in targets:
+            with transaction.atomic(using=db):
+                model.objects.using(db).bulk_create(
+                    [model(symbol=s, name=all_5k_stocks.get(s, s)) for s in symbols],
+                    batch_size=500,
+                    ignore_conflicts=True
+                )
 
     def handle(self, *args, **options):
         api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
@@ -183,25 +577,93 @@ class Command(BaseCommand):
         max_retries = options['retries']
         retry_delay = options['retry_delay']
         interval = options['interval']
-
-        # Create rate limiter
-        rate_limiter = RateLimiter(qpm=qpm, qps=qps)
-
-        # Build task queue
-        tasks = []
-        for symbol in symbols:
+        self._db_batch_size = options['db_batch_size']
+
+        # Prime the freshness map with one bulk SELECT per data type so the
+        # skip decision inside each task costs no SQL and no HTTP. Primed
+        # before seeding so rows created this run don't read as fresh.
+        self._last_updated = {}
+        if not force:
+            sources = []
             if fetch_weekly:
-                tasks.append(('weekly', symbol))
+                sources.append(('weekly', Stock, ADJUSTED_DB))
             if fetch_daily:
-                tasks.append(('daily', symbol))
+                sources.append(('daily', DailyStock, DAILY_DB))
             if fetch_intraday:
-                tasks.append(('intraday', symbol))
-            if fetch_overview:
-                tasks.append(('overview', symbol))
+                sources.append(('intraday', IntradayStock, INTRADAY_DB))
+            for kind, model, db in sources:
+                rows = model.objects.using(db).filter(
+                    symbol__in=symbols
+                ).values_list('symbol', 'last_updated')
+                for sym, ts in rows:
+                    self._last_updated[(kind, sym)] = ts
+
+        # Pre-create stock rows in bulk so worker threads start from a warm
+        # table instead of racing on per-symbol get_or_create INSERTs
+        self.seed_stock_rows(symbols, fetch_weekly or fetch_overview, fetch_daily, fetch_intraday)
+
+        # Preload the stock instances in one SELECT per model; workers then
+        # resolve their row with a dict lookup (the default Stock manager
+        # defers the logo blob, so this stays small even for 5000 rows)
+        self._stock_rows = {}
+        if fetch_weekly or fetch_overview:
+            self._stock_rows['weekly'] = {
+                s.symbol: s for s in Stock.objects.filter(symbol__in=symbols)
+            }
+        if fetch_daily:
+            self._stock_rows['daily'] = {
+                s.symbol: s
+                for s in DailyStock.objects.using(DAILY_DB).filter(symbol__in=symbols)
+            }
+        if fetch_intraday:
+            self._stock_rows['intraday'] = {
+                s.symbol: s
+                for s in IntradayStock.objects.using(INTRADAY_DB).filter(symbol__in=symbols)
+            }
+
+        # Create rate limiter. With a shared cache configured (REDIS_URL),
+        # coordinate across processes so concurrent runs split one API
+        # quota; the in-process token bucket covers the locmem fallback.
+        if os.getenv('REDIS_URL'):
+            rate_limiter = SharedRateLimiter(qpm=qpm, qps=qps)
+        else:
+            rate_limiter = RateLimiter(qpm=qpm, qps=qps)
+
+        # Successful fetches append their pk here; flushed to one bulk
+        # last_updated UPDATE per data type after each run
+        self._touched = {'weekly': [], 'daily': [], 'intraday': []}
+
+        # Start the background APICallLog flusher
+        self._log_queue = queue.Queue()
+        log_thread = threading.Thread(target=self._drain_logs, daemon=True)
+        log_thread.start()
+
+        # Build task queue: one task per symbol carrying every requested
+        # data type, so the three price fetches run back-to-back on the
+        # same worker (warm connection, one pass of bookkeeping) instead
+        # of landing on three different threads at three different times
+        kinds = tuple(
+            kind for kind, wanted in (
+                ('weekly', fetch_weekly),
+                ('daily', fetch_daily),
+                ('intraday', fetch_intraday),
+                ('overview', fetch_overview),
+            ) if wanted
+        )
+        # Fresh data types are dropped here, against the already-primed
+        # freshness map, so they are never even submitted to the pool
+        tasks = []
+        fresh_skipped = 0
+        for symbol in symbols:
+            stale = tuple(k for k in kinds if self.needs_fetch(k, symbol, force))
+            fresh_skipped += len(kinds) - len(stale)
+            if stale:
+                tasks.append((symbol, stale))
 
-        total_tasks = len(tasks)
+        total_tasks = sum(len(task_kinds) for _, task_kinds in tasks)
         self.stdout.write(self.style.WARNING(
-            f'\nFetching {total_tasks} data points ({len(symbols)} stocks)'
+            f'\nFetching {total_tasks} data points ({len(symbols)} stocks, '
+            f'{fresh_skipped} skipped as recent)'
         ))
         self.stdout.write(f'Rate limits: {qpm} QPM, {qps} QPS')
         self.stdout.write(f'Workers: {workers}')
@@ -210,30 +672,69 @@ class Command(BaseCommand):
         estimated_time = total_tasks / qpm
         self.stdout.write(f'Estimated time: {estimated_time:.1f} minutes\n')
 
-        # Track progress
+        # Track progress. All accounting and printing happens on the main
+        # thread inside run_tasks, so no lock is needed anywhere.
         completed = {'count': 0, 'success': 0, 'failed': 0}
         failed_tasks = []  # Collect failed tasks for retry
-        lock = threading.Lock()
         start_time = time.time()
 
-        def fetch_task(task, current_total):
-            data_type, symbol = task
-            task_start = time.time()
-            try:
-                rate_limiter.acquire()
+        # Per-thread task tally for gating connection maintenance
+        thread_state = threading.local()
+
+        def fetch_task(task):
+            """Worker body: every requested data type for one symbol,
+            back-to-back on the same session. Fetch only, share no
+            mutable state, take no locks."""
+            symbol, task_kinds = task
+            results = []
+            for data_type in task_kinds:
+                task_start = time.time()
+                try:
+                    # Don't spend a rate-limit token on a data type that
+                    # would be skipped as fresh anyway
+                    if not self.needs_fetch(data_type, symbol, force):
+                        results.append((data_type, symbol, True, 0,
+                                        'skipped (recent)', time.time() - task_start))
+                        continue
 
-                if data_type == 'weekly':
-                    success, records, error = self.fetch_weekly(symbol, api_key, force)
-                elif data_type == 'daily':
-                    success, records, error = self.fetch_daily(symbol, api_key, force)
-                elif data_type == 'intraday':
-                    success, records, error = self.fetch_intraday(symbol, api_key, force, interval)
-                else:  # overview
-                    success, records, error = self.fetch_overview(symbol, api_key, force)
+                    rate_limiter.acquire()
 
-                task_time = time.time() - task_start
+                    if data_type == 'overview':
+                        success, records, error = self.fetch_overview(symbol, api_key, force)
+                    else:
+                        success, records, error = self.fetch_prices(
+                            data_type, symbol, api_key, force, interval)
+
+                    # A fetcher that fell back to its own freshness check
+                    # (symbol outside the primed map) returned without any
+                    # network call: credit the token back
+                    if success and error == 'skipped (recent)':
+                        rate_limiter.release()
+
+                    results.append((data_type, symbol, success, records, error,
+                                    time.time() - task_start))
+                except Exception as e:
+                    results.append((data_type, symbol, False, 0, str(e),
+                                    time.time() - task_start))
+
+            # Recycle stale DB connections periodically per thread instead
+            # of inspecting every alias after every symbol: with
+            # CONN_MAX_AGE at 10 minutes a check every 50 tasks is enough
+            # to prevent leaks in long --all runs
+            thread_state.tasks = getattr(thread_state, 'tasks', 0) + 1
+            if thread_state.tasks % 50 == 0:
+                close_old_connections()
+            return results
 
-                with lock:
+        def run_tasks(task_list, run_label=""):
+            """Execute a batch of tasks, doing all bookkeeping as results
+            arrive on the main thread."""
+            current_total = sum(len(task_kinds) for _, task_kinds in task_list)
+            if run_label:
+                self.stdout.write(self.style.WARNING(f"\n{run_label}"))
+
+            def account(task_results):
+                for data_type, symbol, success, records, error, task_time in task_results:
                     completed['count'] += 1
                     if success:
                         completed['success'] += 1
@@ -249,7 +750,7 @@ class Command(BaseCommand):
                         if self.is_retriable_error(error):
                             failed_tasks.append((data_type, symbol, error))
 
-                    # Progress summary every 20 tasks
+                    # Progress summary every 20 data points
                     if completed['count'] % 20 == 0 or completed['count'] == current_total:
                         elapsed = time.time() - start_time
                         rate = completed['count'] / (elapsed / 60) if elapsed > 0 else 0
@@ -260,34 +761,30 @@ class Command(BaseCommand):
                             f"Rate: {rate:.1f}/min, ETA: {remaining:.1f}min ---\n"
                         ))
 
-                return (data_type, symbol, success, error)
-            except Exception as e:
-                error_str = str(e)
-                with lock:
-                    completed['count'] += 1
-                    completed['failed'] += 1
-                    self.stdout.write(
-                        self.style.ERROR(f"✗ {symbol} ({data_type}) - Exception: {error_str}")
-                    )
-                    # Track retriable failures
-                    if self.is_retriable_error(error_str):
-                        failed_tasks.append((data_type, symbol, error_str))
-                return (data_type, symbol, False, error_str)
-            finally:
-                # Release database connections back to the pool
-                # Critical for threaded Django to prevent connection exhaustion
-                close_old_connections()
-
-        def run_tasks(task_list, run_label=""):
-            """Execute a batch of tasks and return results."""
-            current_total = len(task_list)
-            if run_label:
-                self.stdout.write(self.style.WARNING(f"\n{run_label}"))
-
-            with ThreadPoolExecutor(max_workers=workers) as executor:
-                futures = [executor.submit(fetch_task, task, current_total) for task in task_list]
-                for future in as_completed(futures):
-                    future.result()
+            # Bounded submission (same pattern as fetch_logos): keep a few
+            # tasks per worker in flight instead of queueing all 5000 up
+            # front, so memory stays capped and results are accounted as
+            # they finish rather than after the whole queue drains
+            max_in_flight = workers * 4
+            in_flight = set()
+            for task in task_list:
+                in_flight.add(executor.submit(fetch_task, task))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        account(future.result())
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account(future.result())
+
+            # All workers are idle now; stamp this run's fetches in bulk
+            self._flush_touched()
+
+        # One pool spans the main run and every retry round, so worker
+        # threads (and their warm per-thread state) are reused instead of
+        # being torn down and respawned between rounds
+        executor = ThreadPoolExecutor(max_workers=workers)
 
         # Main execution
         run_tasks(tasks)
@@ -298,15 +795,29 @@ class Command(BaseCommand):
             retry_round += 1
             retriable_count = len(failed_tasks)
 
+            # Exponential backoff with jitter instead of a flat sleep: the
+            # base depends on what actually failed. Rate-limit errors need
+            # the full --retry-delay window to let the quota recover, while
+            # a socket hiccup is usually gone within seconds. Jitter keeps
+            # concurrent runs from retrying in lockstep.
+            rate_limited = any(
+                'rate limit' in str(err).lower() or 'Information' in str(err)
+                for _, _, err in failed_tasks
+            )
+            base = retry_delay if rate_limited else min(retry_delay, 2)
+            backoff = min(base * 2 ** (retry_round - 1), retry_delay * 4)
+            backoff *= 1 + random.uniform(0, 0.5)
+
             self.stdout.write(self.style.WARNING(
                 f'\n=== RETRY ROUND {retry_round}/{max_retries} ===\n'
                 f'Retriable failures: {retriable_count}\n'
-                f'Waiting {retry_delay}s before retry...'
+                f'Waiting {backoff:.1f}s before retry...'
             ))
-            time.sleep(retry_delay)
+            time.sleep(backoff)
 
-            # Reset counters for this retry round
-            retry_tasks = [(dt, sym) for dt, sym, _ in failed_tasks]
+            # Reset counters for this retry round. Retries are per data
+            # type: only the failed fetch re-runs, not the whole symbol.
+            retry_tasks = [(sym, (dt,)) for dt, sym, _ in failed_tasks]
             failed_tasks.clear()
             completed['count'] = 0
             completed['failed'] = 0
@@ -320,6 +831,21 @@ class Command(BaseCommand):
                 f'{retry_success}/{retriable_count} recovered'
             ))
 
+        executor.shutdown(wait=True)
+
+        # Stop the log flusher and wait for the final batch to land
+        self._log_queue.put(None)
+        log_thread.join()
+
+        # One-shot cleanup: drop this thread's persistent connections now
+        # that the run is over, instead of holding them until process exit
+        # (worker-thread connections die with their threads above). Skipped
+        # when a call_command caller owns an open transaction — closing a
+        # connection mid-atomic flags it needs_rollback and silently aborts
+        # the caller's work.
+        if not any(connections[alias].in_atomic_block for alias in connections):
+            connections.close_all()
+
         # Summary
         elapsed = time.time() - start_time
         final_failed = total_tasks - completed['success']
@@ -339,200 +865,88 @@ class Command(BaseCommand):
             for data_type, symbol, error in failed_tasks[:10]:  # Show first 10
                 self.stdout.write(f'  - {symbol} ({data_type}): {error}')
 
-    def fetch_weekly(self, symbol, api_key, force):
-        """Fetch weekly data for a symbol using bulk operations.
-        Returns: (success, records_count, error_message)
-        """
-        try:
-            stock, created = Stock.objects.get_or_create(
-                symbol=symbol,
-                defaults={'name': all_5k_stocks.get(symbol, symbol)}
-            )
-
-            if not force and not created:
-                time_diff = timezone.now() - stock.last_updated
-                if time_diff < timedelta(hours=1):
-                    return (True, 0, 'skipped (recent)')
+    def fetch_prices(self, data_type, symbol, api_key, force, interval='1min'):
+        """Fetch one price data type for a symbol using bulk operations.
 
-            url = f'https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY_ADJUSTED&symbol={symbol}&apikey={api_key}'
-            response = requests.get(url, timeout=30)
-            data = response.json()
-
-            if 'Error Message' in data:
-                error = data.get('Error Message', 'Unknown error')
-                APICallLog.objects.create(symbol=symbol, success=False, error_message=error)
-                return (False, 0, error)
-
-            if 'Note' in data:
-                error = data.get('Note', 'Rate limited')
-                APICallLog.objects.create(symbol=symbol, success=False, error_message=error)
-                return (False, 0, 'API rate limit hit')
-
-            time_series_key = 'Weekly Adjusted Time Series' if 'Weekly Adjusted Time Series' in data else 'Weekly Time Series'
-            if time_series_key not in data:
-                APICallLog.objects.create(symbol=symbol, success=False, error_message='Unexpected format')
-                return (False, 0, f'Unexpected response: {list(data.keys())}')
-
-            time_series = data[time_series_key]
-
-            # Delete existing prices and bulk insert new ones (much faster than update_or_create)
-            with transaction.atomic():
-                StockPrice.objects.filter(stock=stock).delete()
-
-                prices_to_create = []
-                for date_str, values in time_series.items():
-                    date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    volume = values.get('6. volume') or values.get('5. volume')
-
-                    # Calculate adjustment ratio for stock splits/dividends
-                    # Alpha Vantage only provides adjusted close, so we derive the ratio
-                    # and apply it to open/high/low for consistency
-                    raw_close = float(values['4. close'])
-                    adjusted_close = float(values.get('5. adjusted close', raw_close))
-                    adj_ratio = adjusted_close / raw_close if raw_close != 0 else 1
-
-                    prices_to_create.append(StockPrice(
-                        stock=stock,
-                        date=date,
-                        open_price=float(values['1. open']) * adj_ratio,
-                        high_price=float(values['2. high']) * adj_ratio,
-                        low_price=float(values['3. low']) * adj_ratio,
-                        close_price=adjusted_close,
-                        volume=volume
-                    ))
-
-                StockPrice.objects.bulk_create(prices_to_create, batch_size=500)
-                stock.save()
-
-            APICallLog.objects.create(symbol=symbol, success=True)
-            return (True, len(prices_to_create), None)
-
-        except Exception as e:
-            APICallLog.objects.create(symbol=symbol, success=False, error_message=str(e))
-            return (False, 0, str(e))
-
-    def fetch_daily(self, symbol, api_key, force):
-        """Fetch daily data for a symbol using bulk operations.
+        Shared body for the weekly/daily/intraday endpoints; everything
+        type-specific comes from PRICE_CONFIGS.
         Returns: (success, records_count, error_message)
         """
+        cfg = self.PRICE_CONFIGS[data_type]
+        touched = self._touched[data_type]
         try:
-            stock, created = DailyStock.objects.using('daily').get_or_create(
-                symbol=symbol,
-                defaults={'name': all_5k_stocks.get(symbol, symbol)}
-            )
-
-            if not force and not created:
-                time_diff = timezone.now() - stock.last_updated
-                if time_diff < timedelta(hours=1):
-                    return (True, 0, 'skipped (recent)')
+            # Served from the dict preloaded in handle(); symbols outside
+            # the primed set fall back to a get_or_create round-trip
+            stock = self._stock_rows.get(data_type, {}).get(symbol)
+            if stock is None:
+                stock, created = cfg['stock_model'].objects.using(cfg['db']).get_or_create(
+                    symbol=symbol,
+                    defaults={'name': all_5k_stocks.get(symbol, symbol)}
+                )
+                if not force and not created:
+                    time_diff = timezone.now() - stock.last_updated
+                    if time_diff < self.FRESHNESS[data_type]:
+                        return (True, 0, 'skipped (recent)')
 
-            url = f'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&outputsize=full&apikey={api_key}'
-            response = requests.get(url, timeout=30)
-            data = response.json()
+            url = cfg['url'].format(symbol=symbol, api_key=api_key, interval=interval)
+            headers = {} if force else _conditional_headers(stock.last_updated)
+            response = _session.get(url, timeout=(5, 30), headers=headers)
+            if response.status_code == 304:
+                touched.append(stock.pk)
+                self._log_call(symbol, True)
+                return (True, 0, 'not modified (304)')
+            text = response.text
+
+            # Unchanged payload (hash set only after a validated write):
+            # skip parsing and the whole write path, just refresh the stamp
+            body_hash = hashlib.sha1(response.content).hexdigest()
+            hash_key = cfg['hash_key'].format(symbol=symbol, interval=interval)
+            if not force and cache.get(hash_key) == body_hash:
+                touched.append(stock.pk)
+                self._log_call(symbol, True)
+                return (True, 0, 'unchanged')
+
+            # Errors still come back as JSON even with datatype=csv; a good
+            # response starts with the CSV header row
+            if not text.startswith('timestamp,'):
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    self._log_call(symbol, False, 'Unexpected format')
+                    return (False, 0, 'Unexpected response format')
 
-            if 'Error Message' in data:
-                return (False, 0, data.get('Error Message', 'Unknown error'))
+                if 'Error Message' in data:
+                    error = data.get('Error Message', 'Unknown error')
+                    self._log_call(symbol, False, error)
+                    return (False, 0, error)
 
-            if 'Note' in data:
-                return (False, 0, 'API rate limit hit')
+                if 'Note' in data:
+                    self._log_call(symbol, False, data.get('Note', 'Rate limited'))
+                    return (False, 0, 'API rate limit hit')
 
-            time_series_key = 'Time Series (Daily)'
-            if time_series_key not in data:
+                self._log_call(symbol, False, 'Unexpected format')
                 return (False, 0, f'Unexpected response: {list(data.keys())}')
 
-            time_series = data[time_series_key]
-
-            # Delete existing and bulk insert (much faster)
-            with transaction.atomic():
-                DailyStockPrice.objects.using('daily').filter(stock=stock).delete()
-
-                prices_to_create = []
-                for date_str, values in time_series.items():
-                    date = datetime.strptime(date_str, '%Y-%m-%d').date()
-
-                    # Calculate adjustment ratio for stock splits/dividends
-                    raw_close = float(values['4. close'])
-                    adjusted_close = float(values.get('5. adjusted close', raw_close))
-                    adj_ratio = adjusted_close / raw_close if raw_close != 0 else 1
-
-                    prices_to_create.append(DailyStockPrice(
-                        stock=stock,
-                        date=date,
-                        open_price=float(values['1. open']) * adj_ratio,
-                        high_price=float(values['2. high']) * adj_ratio,
-                        low_price=float(values['3. low']) * adj_ratio,
-                        close_price=adjusted_close,
-                        volume=values.get('6. volume', values.get('5. volume'))
-                    ))
-
-                DailyStockPrice.objects.using('daily').bulk_create(prices_to_create, batch_size=500)
-                stock.save(using='daily')
-
-            return (True, len(prices_to_create), None)
-
-        except Exception as e:
-            return (False, 0, str(e))
-
-    def fetch_intraday(self, symbol, api_key, force, interval='1min'):
-        """Fetch intraday data for a symbol using bulk operations.
-        Returns: (success, records_count, error_message)
-        """
-        try:
-            stock, created = IntradayStock.objects.using('intraday').get_or_create(
-                symbol=symbol,
-                defaults={'name': all_5k_stocks.get(symbol, symbol)}
-            )
-
-            if not force and not created:
-                time_diff = timezone.now() - stock.last_updated
-                if time_diff < timedelta(minutes=30):
-                    return (True, 0, 'skipped (recent)')
+            rows = cfg['parse'](text, stock.id)
 
-            url = f'https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&apikey={api_key}'
-            response = requests.get(url, timeout=30)
-            data = response.json()
+            # Batched upsert (INSERT ... ON CONFLICT DO UPDATE): no delete
+            # churn, no surrounding transaction. Each page is atomic as a
+            # statement and the upsert is idempotent, so an interrupted
+            # symbol is simply refetched — its freshness stamp below never
+            # lands, and the next run redoes the whole payload.
+            with connections[cfg['db']].cursor() as cursor:
+                execute_values(cursor, cfg['upsert_sql'], rows, page_size=self._db_batch_size)
 
-            if 'Error Message' in data:
-                return (False, 0, data.get('Error Message', 'Unknown error'))
+            # last_updated is stamped in one bulk UPDATE per data type at
+            # the end of the run (list.append is atomic under the GIL)
+            touched.append(stock.pk)
 
-            if 'Note' in data:
-                return (False, 0, 'API rate limit hit')
-
-            # Find the time series key dynamically (handles 1min, 5min, 15min, 30min, 60min)
-            time_series_key = next((k for k in data.keys() if k.startswith('Time Series')), None)
-            if time_series_key is None:
-                return (False, 0, f'No time series in response: {list(data.keys())}')
-
-            time_series = data[time_series_key]
-
-            # Delete existing and bulk insert (much faster)
-            # Alpha Vantage returns timestamps in US Eastern time
-            eastern = pytz.timezone('US/Eastern')
-
-            with transaction.atomic():
-                IntradayStockPrice.objects.using('intraday').filter(stock=stock).delete()
-
-                prices_to_create = []
-                for timestamp_str, values in time_series.items():
-                    naive_timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                    # Make timezone-aware (US Eastern) then convert to UTC
-                    aware_timestamp = eastern.localize(naive_timestamp)
-                    prices_to_create.append(IntradayStockPrice(
-                        stock=stock,
-                        timestamp=aware_timestamp,
-                        open_price=values['1. open'],
-                        high_price=values['2. high'],
-                        low_price=values['3. low'],
-                        close_price=values['4. close'],
-                        volume=values['5. volume']
-                    ))
-
-                IntradayStockPrice.objects.using('intraday').bulk_create(prices_to_create, batch_size=500)
-                stock.save(using='intraday')
-
-            return (True, len(prices_to_create), None)
+            cache.set(hash_key, body_hash, AV_HASH_TTL)
+            self._log_call(symbol, True)
+            return (True, len(rows), None)
 
         except Exception as e:
+            self._log_call(symbol, False, str(e))
             return (False, 0, str(e))
 
     def fetch_overview(self, symbol, api_key, force):
@@ -549,11 +963,13 @@ class Command(BaseCommand):
                 return None
 
         try:
-            # Get or create the Stock object in the 'adjusted' database
-            stock, created = Stock.objects.get_or_create(
-                symbol=symbol,
-                defaults={'name': all_5k_stocks.get(symbol, symbol)}
-            )
+            # Get the Stock object (preloaded in handle() when available)
+            stock = self._stock_rows.get('weekly', {}).get(symbol)
+            if stock is None:
+                stock, created = Stock.objects.get_or_create(
+                    symbol=symbol,
+                    defaults={'name': all_5k_stocks.get(symbol, symbol)}
+                )
 
             # Check if we have recent overview data (within 48 hours)
             if not force:
@@ -567,7 +983,7 @@ class Command(BaseCommand):
 
             # Fetch from Alpha Vantage
             url = f'https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={api_key}'
-            response = requests.get(url, timeout=30)
+            response = _session.get(url, timeout=(5, 30))
             data = response.json()
 
             # Check for API errors
@@ -657,9 +1073,9 @@ class Command(BaseCommand):
                 }
             )
 
-            APICallLog.objects.create(symbol=symbol, success=True)
+            self._log_call(symbol, True)
             return (True, 1, None)
 
         except Exception as e:
-            APICallLog.objects.create(symbol=symbol, success=False, error_message=str(e))
+            self._log_call(symbol, False, str(e))
             return (False, 0, str(e))
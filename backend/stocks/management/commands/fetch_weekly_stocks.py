@@ -1,12 +1,32 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from stocks.models import Stock, StockPrice, APICallLog
+from stocks.db import ADJUSTED_DB
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-from datetime import datetime, timedelta
+from datetime import date as date_type, timedelta
 from .top5kcompanies import all_5k_stocks
 import time
 
+# Shared session: the loop hits alphavantage.co hundreds of times, so a
+# kept-alive pooled connection saves a TLS handshake per symbol, with
+# transport-level retries for transient 5xx/connection failures
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=['GET'],
+    ),
+))
+
+
 class Command(BaseCommand):
     help = 'Fetch stock data from Alpha Vantage API and store in database'
 
@@ -75,7 +95,7 @@ class Command(BaseCommand):
                 
                 # Fetch from API
                 url = f'https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY_ADJUSTED&symbol={symbol}&apikey={api_key}'
-                response = requests.get(url, timeout=10)
+                response = _session.get(url, timeout=10)
                 data = response.json()
                 
                 # Check for errors
@@ -98,39 +118,46 @@ class Command(BaseCommand):
                 time_series = data[time_series_key]
                 prices_created = 0
                 prices_updated = 0
-                
-                for date_str, values in time_series.items():
-                    date = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-                    # Handle both regular and adjusted time series formats
-                    volume = values.get('6. volume') or values.get('5. volume')
+                # One transaction per symbol: autocommit would fsync per
+                # row, and the fsync dominates for small writes. Opened on
+                # the alias the router actually sends these writes to —
+                # atomic() on default would leave them in autocommit.
+                with transaction.atomic(using=ADJUSTED_DB):
+                    for date_str, values in time_series.items():
+                        # fromisoformat is the C fast path; strptime
+                        # re-parses the format string per call
+                        date = date_type.fromisoformat(date_str)
 
-                    # Calculate adjustment ratio for stock splits/dividends
-                    # Alpha Vantage only provides adjusted close, so we derive the ratio
-                    # and apply it to open/high/low for consistency
-                    raw_close = float(values['4. close'])
-                    adjusted_close = float(values.get('5. adjusted close', raw_close))
-                    adj_ratio = adjusted_close / raw_close if raw_close != 0 else 1
+                        # Handle both regular and adjusted time series formats
+                        volume = values.get('6. volume') or values.get('5. volume')
 
-                    price, created = StockPrice.objects.update_or_create(
-                        stock=stock,
-                        date=date,
-                        defaults={
-                            'open_price': float(values['1. open']) * adj_ratio,
-                            'high_price': float(values['2. high']) * adj_ratio,
-                            'low_price': float(values['3. low']) * adj_ratio,
-                            'close_price': adjusted_close,
-                            'volume': volume
-                        }
-                    )
+                        # Calculate adjustment ratio for stock splits/dividends
+                        # Alpha Vantage only provides adjusted close, so we derive the ratio
+                        # and apply it to open/high/low for consistency
+                        raw_close = float(values['4. close'])
+                        adjusted_close = float(values.get('5. adjusted close', raw_close))
+                        adj_ratio = adjusted_close / raw_close if raw_close != 0 else 1
+
+                        price, created = StockPrice.objects.update_or_create(
+                            stock=stock,
+                            date=date,
+                            defaults={
+                                'open_price': float(values['1. open']) * adj_ratio,
+                                'high_price': float(values['2. high']) * adj_ratio,
+                                'low_price': float(values['3. low']) * adj_ratio,
+                                'close_price': adjusted_close,
+                                'volume': volume
+                            }
+                        )
+                        
+                        if created:
+                            prices_created += 1
+                        else:
+                            prices_updated += 1
                     
-                    if created:
-                        prices_created += 1
-                    else:
-                        prices_updated += 1
-                
-                # Update last_updated timestamp
-                stock.save()
+                    # Update last_updated timestamp
+                    stock.save()
                 
                 # Log success
                 APICallLog.objects.create(
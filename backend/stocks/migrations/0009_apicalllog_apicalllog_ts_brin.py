@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-08-26 16:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_stock_logo_stock_logo_content_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apicalllog',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['timestamp'], name='apicalllog_ts_brin'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-08-26 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_apicalllog_apicalllog_ts_brin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='logo_etag',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='logo_last_modified',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
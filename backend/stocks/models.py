@@ -1,7 +1,24 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from django.utils import timezone
 
 
+class StockManager(models.Manager):
+    """Defer the binary logo column by default.
+
+    The blob can be tens of KB per row, so loading it on every list query
+    bloats SELECTs that only need symbol/name metadata. Code that actually
+    renders the blob opts back in via with_logo().
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('logo')
+
+    def with_logo(self):
+        """Return a queryset with the logo column loaded eagerly."""
+        return self.get_queryset().defer(None)
+
+
 class Stock(models.Model):
     """Model for storing stock information"""
     symbol = models.CharField(max_length=10, unique=True, db_index=True)
@@ -11,8 +28,13 @@ class Stock(models.Model):
     is_sp500 = models.BooleanField(default=False, db_index=True)
     logo = models.BinaryField(blank=True, null=True)
     logo_content_type = models.CharField(max_length=50, blank=True, null=True)
+    # Validators from the logo CDN, used for conditional GETs on re-download
+    logo_etag = models.CharField(max_length=100, blank=True, null=True)
+    logo_last_modified = models.CharField(max_length=50, blank=True, null=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    objects = StockManager()
+
     class Meta:
         ordering = ['symbol']
 
@@ -100,6 +122,12 @@ class APICallLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # BRIN: rows arrive in timestamp order, so a block-range index
+            # covers the admin's date filters at a few KB even when the log
+            # grows to millions of rows
+            BrinIndex(fields=['timestamp'], name='apicalllog_ts_brin'),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - {self.timestamp}"
@@ -9,6 +9,7 @@ from stocks.models import (
     DailyStock, DailyStockPrice,
     StockPerformance
 )
+from stocks.db import DAILY_DB
 from stocks.management.commands.fortune500 import all_fortune_500
 
 
@@ -73,15 +74,17 @@ class PerformanceCalculator:
         fortune_500_symbols = set(all_fortune_500.keys())
 
         try:
-            daily_available = DailyStock.objects.using('daily').exists()
+            daily_available = DailyStock.objects.using(DAILY_DB).exists()
             if not daily_available:
                 return performances
             # Filter to only Fortune 500 stocks
-            stocks = DailyStock.objects.using('daily').filter(symbol__in=fortune_500_symbols)
+            stocks = DailyStock.objects.using(DAILY_DB).filter(symbol__in=fortune_500_symbols)
         except Exception:
             return performances
 
-        for stock in stocks:
+        # Server-side cursor: stream rows instead of buffering the whole
+        # result set client-side before iteration
+        for stock in stocks.iterator(chunk_size=2000):
             perf = self._calculate_stock_performance_daily(
                 stock, period_name, start_date
             )
@@ -97,7 +100,7 @@ class PerformanceCalculator:
         # Filter to only Fortune 500 stocks
         stocks = Stock.objects.filter(symbol__in=fortune_500_symbols)
 
-        for stock in stocks:
+        for stock in stocks.iterator(chunk_size=2000):
             perf = self._calculate_stock_performance_weekly(
                 stock, period_name, start_date
             )
@@ -110,7 +113,7 @@ class PerformanceCalculator:
         """Calculate performance for a single stock using daily data."""
         if period_name == '1D':
             # Get last 2 trading days
-            recent_prices = DailyStockPrice.objects.using('daily').filter(
+            recent_prices = DailyStockPrice.objects.using(DAILY_DB).filter(
                 stock=stock
             ).order_by('-date')[:2]
 
@@ -121,12 +124,12 @@ class PerformanceCalculator:
             start_price_obj = recent_prices[1]
         else:
             # Get data from start_date onwards
-            start_price_obj = DailyStockPrice.objects.using('daily').filter(
+            start_price_obj = DailyStockPrice.objects.using(DAILY_DB).filter(
                 stock=stock,
                 date__gte=start_date
             ).order_by('date').first()
 
-            end_price_obj = DailyStockPrice.objects.using('daily').filter(
+            end_price_obj = DailyStockPrice.objects.using(DAILY_DB).filter(
                 stock=stock
             ).order_by('-date').first()
 
@@ -2,6 +2,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Stock, StockPrice
+from .db import DAILY_DB, INTRADAY_DB
 from datetime import datetime, timedelta
 from django.db.models import Count, Max, Min
 
@@ -83,8 +84,8 @@ def get_multiple_stocks(request):
         try:
             if use_daily:
                 # Fetch from daily database
-                stock = DailyStock.objects.using('daily').prefetch_related('daily_prices').get(symbol=symbol)
-                prices = DailyStockPrice.objects.using('daily').filter(
+                stock = DailyStock.objects.using(DAILY_DB).prefetch_related('daily_prices').get(symbol=symbol)
+                prices = DailyStockPrice.objects.using(DAILY_DB).filter(
                     stock=stock,
                     date__gte=lookback
                 ).order_by('date')
@@ -146,8 +147,8 @@ def get_multiple_stocks(request):
                 # Try to retrieve the newly fetched stocks from daily database
                 for symbol in missing_symbols:
                     try:
-                        stock = DailyStock.objects.using('daily').prefetch_related('daily_prices').get(symbol=symbol)
-                        prices = DailyStockPrice.objects.using('daily').filter(
+                        stock = DailyStock.objects.using(DAILY_DB).prefetch_related('daily_prices').get(symbol=symbol)
+                        prices = DailyStockPrice.objects.using(DAILY_DB).filter(
                             stock=stock,
                             date__gte=lookback
                         ).order_by('date')
@@ -483,7 +484,7 @@ def get_data_freshness(request):
         stocks_data = []
 
         if db_type == 'daily':
-            stocks = DailyStock.objects.using('daily').annotate(
+            stocks = DailyStock.objects.using(DAILY_DB).annotate(
                 latest_date=Max('daily_prices__date'),
                 oldest_date=Min('daily_prices__date'),
                 price_count=Count('daily_prices')
@@ -517,7 +518,7 @@ def get_data_freshness(request):
                 })
 
         elif db_type == 'intraday':
-            stocks = IntradayStock.objects.using('intraday').annotate(
+            stocks = IntradayStock.objects.using(INTRADAY_DB).annotate(
                 latest_timestamp=Max('intraday_prices__timestamp'),
                 oldest_timestamp=Min('intraday_prices__timestamp'),
                 price_count=Count('intraday_prices')
@@ -567,8 +568,8 @@ def get_data_freshness(request):
 
         # Daily data for symbol
         try:
-            stock = DailyStock.objects.using('daily').get(symbol=symbol)
-            prices = DailyStockPrice.objects.using('daily').filter(stock=stock).aggregate(
+            stock = DailyStock.objects.using(DAILY_DB).get(symbol=symbol)
+            prices = DailyStockPrice.objects.using(DAILY_DB).filter(stock=stock).aggregate(
                 latest_date=Max('date'),
                 oldest_date=Min('date'),
                 price_count=Count('id')
@@ -588,8 +589,8 @@ def get_data_freshness(request):
 
         # Intraday data for symbol
         try:
-            stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
-            prices = IntradayStockPrice.objects.using('intraday').filter(stock=stock).aggregate(
+            stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
+            prices = IntradayStockPrice.objects.using(INTRADAY_DB).filter(stock=stock).aggregate(
                 latest_timestamp=Max('timestamp'),
                 oldest_timestamp=Min('timestamp'),
                 price_count=Count('id')
@@ -634,13 +635,13 @@ def get_data_freshness(request):
 
     # Daily data
     try:
-        daily_latest = DailyStockPrice.objects.using('daily').aggregate(
+        daily_latest = DailyStockPrice.objects.using(DAILY_DB).aggregate(
             latest_date=Max('date'),
             oldest_date=Min('date')
         )
-        daily_stock_count = DailyStock.objects.using('daily').count()
-        daily_price_count = DailyStockPrice.objects.using('daily').count()
-        daily_last_updated = DailyStock.objects.using('daily').aggregate(latest=Max('last_updated'))['latest']
+        daily_stock_count = DailyStock.objects.using(DAILY_DB).count()
+        daily_price_count = DailyStockPrice.objects.using(DAILY_DB).count()
+        daily_last_updated = DailyStock.objects.using(DAILY_DB).aggregate(latest=Max('last_updated'))['latest']
 
         result['daily'] = {
             'available': True,
@@ -655,13 +656,13 @@ def get_data_freshness(request):
 
     # Intraday data
     try:
-        intraday_latest = IntradayStockPrice.objects.using('intraday').aggregate(
+        intraday_latest = IntradayStockPrice.objects.using(INTRADAY_DB).aggregate(
             latest_timestamp=Max('timestamp'),
             oldest_timestamp=Min('timestamp')
         )
-        intraday_stock_count = IntradayStock.objects.using('intraday').count()
-        intraday_price_count = IntradayStockPrice.objects.using('intraday').count()
-        intraday_last_updated = IntradayStock.objects.using('intraday').aggregate(latest=Max('last_updated'))['latest']
+        intraday_stock_count = IntradayStock.objects.using(INTRADAY_DB).count()
+        intraday_price_count = IntradayStockPrice.objects.using(INTRADAY_DB).count()
+        intraday_last_updated = IntradayStock.objects.using(INTRADAY_DB).aggregate(latest=Max('last_updated'))['latest']
 
         result['intraday'] = {
             'available': True,
@@ -1304,7 +1305,8 @@ def get_stock_logo(request, symbol):
 
     symbol = symbol.upper()
     try:
-        stock = Stock.objects.get(symbol=symbol)
+        # Logo is deferred by default; load it eagerly here
+        stock = Stock.objects.with_logo().get(symbol=symbol)
     except Stock.DoesNotExist:
         return Response({'error': f'Stock {symbol} not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1351,7 +1353,7 @@ def get_intraday_stock_data(request, symbol):
 
     try:
         # Try to get intraday stock from database
-        stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
+        stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
 
         # Check if data is stale (older than 15 minutes during market hours)
         eastern = pytz.timezone('US/Eastern')
@@ -1373,7 +1375,7 @@ def get_intraday_stock_data(request, symbol):
                     stdout=out
                 )
                 # Refresh stock object
-                stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
+                stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
             except Exception as e:
                 # Continue with existing data if refresh fails
                 pass
@@ -1389,7 +1391,7 @@ def get_intraday_stock_data(request, symbol):
                 force=True,
                 stdout=out
             )
-            stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
+            stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
         except Exception as e:
             return Response(
                 {'error': f'Failed to fetch intraday data for {symbol}: {str(e)}'},
@@ -1398,7 +1400,7 @@ def get_intraday_stock_data(request, symbol):
 
     # Get intraday prices for the requested time period
     start_date = timezone.now() - timedelta(days=days)
-    prices = IntradayStockPrice.objects.using('intraday').filter(
+    prices = IntradayStockPrice.objects.using(INTRADAY_DB).filter(
         stock=stock,
         timestamp__gte=start_date
     ).order_by('timestamp')
@@ -1477,11 +1479,11 @@ def get_multiple_intraday_stocks(request):
     # First pass: check which stocks exist
     for symbol in symbols:
         try:
-            stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
+            stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
 
             # Get intraday prices
             start_date = timezone.now() - timedelta(days=days)
-            prices = IntradayStockPrice.objects.using('intraday').filter(
+            prices = IntradayStockPrice.objects.using(INTRADAY_DB).filter(
                 stock=stock,
                 timestamp__gte=start_date
             ).order_by('timestamp')
@@ -1527,10 +1529,10 @@ def get_multiple_intraday_stocks(request):
             # Retrieve newly fetched stocks
             for symbol in missing_symbols:
                 try:
-                    stock = IntradayStock.objects.using('intraday').get(symbol=symbol)
+                    stock = IntradayStock.objects.using(INTRADAY_DB).get(symbol=symbol)
 
                     start_date = timezone.now() - timedelta(days=days)
-                    prices = IntradayStockPrice.objects.using('intraday').filter(
+                    prices = IntradayStockPrice.objects.using(INTRADAY_DB).filter(
                         stock=stock,
                         timestamp__gte=start_date
                     ).order_by('timestamp')